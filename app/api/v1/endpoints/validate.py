@@ -2,7 +2,8 @@ from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.schemas.validation import ValidationResults
 from app.services import pdf_extractor, djp_client, validator
 from app.mock import djp_mock
-import requests
+import asyncio
+import httpx
 
 router = APIRouter()
 
@@ -17,35 +18,41 @@ async def validate_efaktur(file: UploadFile = File(...)):
                 detail="Invalid file type. Only PDF and JPG/JPEG files are supported"
             )
         
-        # File read
-        content = await file.read()
-        if not content:
+        # Check the magic bytes before reading the rest, Starlette has already
+        # spooled the upload but rejected files skip building a bytes copy
+        header = await file.read(8)
+        if not header:
             raise HTTPException(status_code=400, detail="No file provided")
             
         # Basic file format validation
-        if content_type == "application/pdf" and not content.startswith(b'%PDF'):
+        if content_type == "application/pdf" and not header.startswith(b'%PDF'):
             raise HTTPException(
                 status_code=400,
                 detail="Invalid PDF file format"
             )
-        elif content_type in ["image/jpeg", "image/jpg"] and not content.startswith(b'\xff\xd8\xff'):
+        elif content_type in ["image/jpeg", "image/jpg"] and not header.startswith(b'\xff\xd8\xff'):
             raise HTTPException(
                 status_code=400,
                 detail="Invalid JPEG file format"
             )
 
-        # Parse PDF/JPG fields
-        pdf_data = pdf_extractor.extract_fields(content)
+        # File read
+        await file.seek(0)
+        content = await file.read()
+
+        # Parse PDF/JPG fields and QR URL off the event loop, the PDF is
+        # only opened once for both
+        pdf_data, qr_url = await asyncio.to_thread(pdf_extractor.extract_all, content)
 
-        # Try to get QR URL, fallback to mock if not found
+        # Fetch DJP data for the decoded QR URL, use mock data when the
+        # document had no readable QR code
         try:
-            qr_url = pdf_extractor.extract_qr_url(content)
             if qr_url:
-                djp_data = djp_client.fetch_djp_xml(qr_url)
+                djp_data = await djp_client.fetch_djp_xml(qr_url)
             else:
                 djp_data = djp_mock.get_mock_djp_data()
-        except ValueError as e:
-            # If QR extraction fails, use mock data
+        except ValueError:
+            # DJP response had malformed values (amounts, dates), use mock data
             djp_data = djp_mock.get_mock_djp_data()
 
         # Compare and build response
@@ -54,10 +61,8 @@ async def validate_efaktur(file: UploadFile = File(...)):
     except HTTPException:
         raise
     except ValueError as e:
-        if "No QR code found" in str(e):
-            raise HTTPException(status_code=400, detail="No valid QR code found in the document")
         raise HTTPException(status_code=400, detail=str(e))
-    except requests.RequestException as e:
+    except httpx.HTTPError:
         raise HTTPException(status_code=502, detail="Failed to fetch data from DJP API")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
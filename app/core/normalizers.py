@@ -1,19 +1,44 @@
 import re
+from datetime import date
+from functools import lru_cache
 from typing import Optional
 
+_RE_NONDIGIT = re.compile(r"\D")
+_IDR_TABLE = str.maketrans({".": None, ",": "."})
+_STRIP_NONDIGIT = str.maketrans("", "", "".join(c for c in map(chr, range(256)) if not c.isdigit()))
+_RE_WS = re.compile(r"\s+")
+_RE_PREFIX = re.compile(r"^(CV|PT)[\s\.]*")
+
+INDONESIAN_MONTHS = {
+    "januari": 1,
+    "februari": 2,
+    "maret": 3,
+    "april": 4,
+    "mei": 5,
+    "juni": 6,
+    "juli": 7,
+    "agustus": 8,
+    "september": 9,
+    "oktober": 10,
+    "november": 11,
+    "desember": 12,
+}
 
 def normalize_number(value: str) -> Optional[str]:
     if value is None:
         return None
-    # Remove all non-digit chars
-    digits = re.sub(r"\D", "", value)
+    # Remove all non-digit chars; the translate table only covers latin-1,
+    # so OCR output with other characters still goes through the regex
+    digits = value.translate(_STRIP_NONDIGIT)
+    if not digits.isascii():
+        digits = _RE_NONDIGIT.sub("", digits)
     return digits or None
 
 def normalize_company(name: str) -> str:
-    raw = re.sub(r"\s+", " ", name).replace(".", " ").strip().upper()
+    raw = _RE_WS.sub(" ", name).replace(".", " ").strip().upper()
 
     # match prefix CV atau PT
-    m = re.match(r"^(CV|PT)[\s\.]*", raw)
+    m = _RE_PREFIX.match(raw)
     if m:
         prefix = m.group(1)
         cleaned = raw[m.end():].strip()
@@ -28,18 +53,26 @@ def normalize_idr(amount_str: str) -> float:
         return 0.0
 
     try:
-        # Remove space
-        amount_str = amount_str.strip()
-
-        # Remove dot for thousands separation
-        amount_str = amount_str.replace(".", "")
+        # Remove dot for thousands separation and replace comma with dot in
+        # one pass, float() already ignores surrounding whitespace
+        return float(amount_str.translate(_IDR_TABLE))
+    except ValueError:
+        return 0.0
 
-        # Replace comma with dot
-        amount_str = amount_str.replace(",", ".")
+@lru_cache(maxsize=512)
+def normalize_indonesian_date(date_str: str) -> Optional[date]:
+    """
+    Convert Indonesian formatted date like '1 April 2022' to date.
+    """
+    parts = date_str.split()
+    if len(parts) != 3:
+        return None
 
-        # Convert to float
-        amount = float(amount_str)
+    month = INDONESIAN_MONTHS.get(parts[1].lower())
+    if month is None:
+        return None
 
-        return amount
+    try:
+        return date(int(parts[2]), month, int(parts[0]))
     except ValueError:
-        return 0.0
+        return None
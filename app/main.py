@@ -1,8 +1,18 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.api.v1.endpoints.validate import router as validate_router
+from app.services import djp_client, pdf_extractor
 
 
-app = FastAPI(title="E-Faktur Validation Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await djp_client.close_client()
+    # Waits for QR workers to exit, keep it off the event loop
+    await asyncio.to_thread(pdf_extractor.shutdown_qr_pool)
+
+app = FastAPI(title="E-Faktur Validation Service", version="1.0.0", lifespan=lifespan)
 
 @app.get("/health")
 def health():
@@ -1,14 +1,22 @@
 import os
+from functools import lru_cache
 from typing import Dict
 from app.services.djp_client import parse_xml_response
 
 
 def get_mock_djp_data() -> Dict[str, str]:
     """Read mock XML data and return parsed DJP response."""
+    # Copy so callers can't mutate the cached response
+    return dict(_load_mock_djp_data())
+
+
+@lru_cache(maxsize=1)
+def _load_mock_djp_data() -> Dict[str, str]:
+    """Read and parse mock.xml once per process."""
     
     mock_path = os.path.join(os.path.dirname(__file__), 'mock.xml')
     try:
-        with open(mock_path, 'r') as f:
+        with open(mock_path, 'rb') as f:
             mock_xml = f.read()
         return parse_xml_response(mock_xml)
     except FileNotFoundError:
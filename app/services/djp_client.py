@@ -1,38 +1,95 @@
-from typing import Dict
-import requests
-import xml.etree.ElementTree as ET
-from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional
+import httpx
+from cachetools import TTLCache
+from lxml import etree
+from datetime import date
 from app.core.normalizers import normalize_company
 
+# DJP XML tag -> output field, in output order
+DJP_FIELDS = {
+    "npwpPenjual": "npwpPenjual",
+    "namaPenjual": "namaPenjual",
+    "npwpLawanTransaksi": "npwpPembeli",
+    "namaLawanTransaksi": "namaPembeli",
+    "nomorFaktur": "nomorFaktur",
+    "tanggalFaktur": "tanggalFaktur",
+    "jumlahDpp": "jumlahDpp",
+    "jumlahPpn": "jumlahPpn",
+    "jumlahPpnBm": "jumlahPpnBm",
+}
 
-def fetch_djp_xml(url: str) -> Dict[str, str]:
-    resp = requests.get(url, timeout=15)
+# Responses come from a remote host, never resolve entities or fetch DTDs
+_XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True)
+
+# Shared client keeps connections to the DJP host alive between requests,
+# created on first use so the app can start again after close_client
+_client: Optional[httpx.AsyncClient] = None
+
+# Parsed DJP responses keyed by QR URL; the URL is unique per faktur
+_cache = TTLCache(maxsize=4096, ttl=3600)
+
+
+async def fetch_djp_xml(url: str) -> Dict[str, str]:
+    cached = _cache.get(url)
+    if cached is not None:
+        return dict(cached)
+
+    resp = await get_client().get(url)
     resp.raise_for_status()
-    root = ET.fromstring(resp.text)
-    return {
-        "npwpPenjual": root.findtext("npwpPenjual"),
-        "namaPenjual": normalize_company(root.findtext("namaPenjual")),
-        "npwpPembeli": root.findtext("npwpLawanTransaksi"),
-        "namaPembeli": normalize_company(root.findtext("namaLawanTransaksi")),
-        "nomorFaktur": root.findtext("nomorFaktur"),
-        "tanggalFaktur": datetime.strptime(root.findtext("tanggalFaktur"), "%d/%m/%Y").date(),
-        "jumlahDpp": float(root.findtext("jumlahDpp")),
-        "jumlahPpn": float(root.findtext("jumlahPpn")),
-        "jumlahPpnBm": float(root.findtext("jumlahPpnBm")),
-    }
-
-
-def parse_xml_response(xml_str: str) -> Dict[str, str]:
-    """Parse XML string response from DJP API."""
-    root = ET.fromstring(xml_str)
-    return {
-        "npwpPenjual": root.findtext("npwpPenjual"),
-        "namaPenjual": normalize_company(root.findtext("namaPenjual")),
-        "npwpPembeli": root.findtext("npwpLawanTransaksi"),
-        "namaPembeli": normalize_company(root.findtext("namaLawanTransaksi")),
-        "nomorFaktur": root.findtext("nomorFaktur"),
-        "tanggalFaktur": datetime.strptime(root.findtext("tanggalFaktur"), "%d/%m/%Y").date(),
-        "jumlahDpp": float(root.findtext("jumlahDpp")),
-        "jumlahPpn": float(root.findtext("jumlahPpn")),
-        "jumlahPpnBm": float(root.findtext("jumlahPpnBm")),
-    }
+    # Pass raw bytes so the parser honours the declared encoding
+    data = parse_xml_response(resp.content)
+    _cache[url] = data
+    return dict(data)
+
+
+@lru_cache(maxsize=512)
+def parse_ddmmyyyy(date_str: str) -> date:
+    """Parse DJP date format dd/mm/yyyy without going through strptime."""
+    day, month, year = date_str.split("/")
+    return date(int(year), int(month), int(day))
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared DJP HTTP client, created on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=15.0,
+            # QR URLs are plain http, follow DJP's redirects like requests did
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=32),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared DJP HTTP client if it was started."""
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
+
+
+def parse_xml_response(xml: bytes) -> Dict[str, str]:
+    """Parse raw XML response bytes from DJP API, decoded per the declared encoding."""
+    # Only direct children of the root are fields, the same tags nested in
+    # detail blocks (e.g. detailTransaksi) are ignored
+    root = etree.fromstring(xml, _XML_PARSER)
+    data = dict.fromkeys(DJP_FIELDS.values())
+    for el in root:
+        key = DJP_FIELDS.get(el.tag)
+        if key is not None and data[key] is None:
+            data[key] = el.text
+
+    # Only normalize populated fields, missing ones stay None
+    for key in ("namaPenjual", "namaPembeli"):
+        if data[key]:
+            data[key] = normalize_company(data[key])
+    if data["tanggalFaktur"]:
+        data["tanggalFaktur"] = parse_ddmmyyyy(data["tanggalFaktur"])
+    for key in ("jumlahDpp", "jumlahPpn", "jumlahPpnBm"):
+        if data[key]:
+            data[key] = float(data[key])
+
+    return data
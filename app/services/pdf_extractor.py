@@ -1,88 +1,268 @@
 import io
+import os
+import logging
+import hashlib
 import re
-import pdfplumber
-from PIL import Image, ImageEnhance
-from pyzbar.pyzbar import decode
-from typing import Optional, Dict, List
-from datetime import datetime
+import threading
+import multiprocessing
+import cv2
+import fitz
+import numpy as np
+from cachetools import LRUCache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from PIL import Image
+from typing import Iterable, Iterator, NamedTuple, Optional, Dict, List, Tuple
+from datetime import date
 from app.core.normalizers import (
     normalize_number,
     normalize_idr,
     normalize_company,
+    normalize_indonesian_date,
+    INDONESIAN_MONTHS,
 )
 
-RE_NPWP = r"NPWP\s*:\s*(\d{2}\.\d{3}\.\d{3}\.\d-\d{3}\.\d{3})"
-RE_NAME = r"Nama\s*:\s*(.+)"
-RE_FAKTUR_NUMBER = r"Kode\s+dan\s+Nomor\s+Seri\s+Faktur\s+Pajak\s*:\s*(\d{3}\.\d{3}-\d{2}\.\d{8})"
-RE_FAKTUR_DATE = r"\d{1,2}\s+[A-Za-z]+\s+\d{4}"
-RE_DPP = r"Dasar\s+Pengenaan\s+Pajak\s+([\d\.\,]+)"
-RE_PPN = r"PPN.*?([\d\.]+,\d{2})"
-RE_PPNBM = r"PPnBM.*?([\d\.]+,\d{2})"
-
-indonesian_months = {
-    "januari": "January",
-    "februari": "February",
-    "maret": "March",
-    "april": "April",
-    "mei": "May",
-    "juni": "June",
-    "juli": "July",
-    "agustus": "August",
-    "september": "September",
-    "oktober": "October",
-    "november": "November",
-    "desember": "December",
-}
+logger = logging.getLogger(__name__)
+
+# Field patterns, each captures its value in a group named after the field
+RE_NPWP = r"NPWP\s*:\s*(?P<npwp>\d{2}\.\d{3}\.\d{3}\.\d-\d{3}\.\d{3})"
+RE_NAME = r"(?i:Nama)\s*:\s*(?P<nama>.+)"
+RE_FAKTUR_NUMBER = r"Kode\s+dan\s+Nomor\s+Seri\s+Faktur\s+Pajak\s*:\s*(?P<nomorFaktur>\d{3}\.\d{3}-\d{2}\.\d{8})"
+RE_FAKTUR_DATE = r"(?P<tanggalFaktur>\d{1,2}\s+(?i:%s)\s+\d{4})" % "|".join(INDONESIAN_MONTHS)
+RE_DPP = r"Dasar\s+Pengenaan\s+Pajak\s+(?P<jumlahDpp>[\d\.\,]+)"
+RE_PPN = r"PPN.*?(?P<jumlahPpn>[\d\.]+,\d{2})"
+RE_PPNBM = r"PPnBM.*?(?P<jumlahPpnBm>[\d\.]+,\d{2})"
+
+# All field patterns as one alternation so the text is scanned only once
+_RE_FIELDS = re.compile("|".join((
+    RE_NPWP,
+    RE_NAME,
+    RE_FAKTUR_NUMBER,
+    RE_FAKTUR_DATE,
+    RE_DPP,
+    RE_PPN,
+    RE_PPNBM,
+)))
+
+_RE_NIK = re.compile(r"NIK\s*/?\s*Paspor\s*[:\-]*\s*([A-Z0-9]+)", re.IGNORECASE)
+_RE_NIK_STRIP = re.compile(r"\s*NIK\s*/?\s*Paspor.*", re.IGNORECASE)
+_RE_NIK_LABEL = re.compile(r"\s*NIK\s*/?\s*Paspor[:,\.\-]*", re.IGNORECASE)
+
+class TaxSubject(NamedTuple):
+    """Seller or buyer parsed from a "Nama" line."""
+    name: str
+    id_number: Optional[str]
+    is_company: bool
+
+# Fields the first page must yield before the remaining pages are skipped
+REQUIRED_FIELDS = ("npwpPenjual", "npwpPembeli", "nomorFaktur", "tanggalFaktur", "jumlahDpp")
+
+# Max vertical distance (pt) between words on the same text line
+LINE_TOLERANCE = 3
+
+# Tesseract settings for a single fixed-layout faktur page: LSTM engine only,
+# treat the page as one uniform block of text
+OCR_CONFIG = "--oem 1 --psm 6"
+
+# Page render resolutions for QR detection, tried in order until one decodes
+QR_RESOLUTIONS = (150, 200)
+
+# Images above this pixel count are halved before QR detection
+QR_MAX_PIXELS = 4_000_000
+
+# Placed images covering more of the page than this are scans, not QR symbols
+QR_MAX_PAGE_FRACTION = 0.25
+
+# Upper bound on QR worker processes, each is a full interpreter with
+# PyMuPDF and OpenCV loaded
+QR_MAX_WORKERS = 4
+
+# PyMuPDF is not thread-safe, documents are only touched while holding this lock
+_PDF_LOCK = threading.Lock()
+
+@contextmanager
+def open_pdf(content: bytes) -> Iterator[fitz.Document]:
+    """Open PDF bytes with PyMuPDF, serialized across threads."""
+    with _PDF_LOCK:
+        with fitz.open(stream=content, filetype="pdf") as doc:
+            yield doc
+
+@contextmanager
+def pdf_lock_released() -> Iterator[None]:
+    """Release _PDF_LOCK inside open_pdf for work that does not touch PyMuPDF."""
+    _PDF_LOCK.release()
+    try:
+        yield
+    finally:
+        _PDF_LOCK.acquire()
+
+# Extracted text keyed by content digest, so re-uploads and retries of the
+# same file skip PDF parsing and OCR
+_TEXT_CACHE = LRUCache(maxsize=64)
+
+# Parsed fields and QR URL keyed by content digest, so a repeated upload also
+# skips field parsing and QR rasterization
+_RESULT_CACHE = LRUCache(maxsize=64)
+
+# Guards both _TEXT_CACHE and _RESULT_CACHE
+_CACHE_LOCK = threading.Lock()
+
+def content_digest(content: bytes) -> bytes:
+    """Digest used as cache key for uploaded file content."""
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+def get_cached_text(key: bytes) -> Optional[str]:
+    """Return cached text for a content digest, if any."""
+    with _CACHE_LOCK:
+        return _TEXT_CACHE.get(key)
+
+def cache_text(key: bytes, text: str) -> None:
+    """Store extracted text for a content digest."""
+    with _CACHE_LOCK:
+        _TEXT_CACHE[key] = text
+
+def get_cached_result(key: bytes) -> Optional[Tuple[Dict[str, Optional[str]], Optional[str]]]:
+    """Return cached fields and QR URL for a content digest, if any."""
+    with _CACHE_LOCK:
+        result = _RESULT_CACHE.get(key)
+    if result is None:
+        return None
+    fields, qr_url = result
+    return dict(fields), qr_url
+
+def cache_result(key: bytes, fields: Dict[str, Optional[str]], qr_url: Optional[str]) -> None:
+    """Store fields and QR URL for a content digest."""
+    with _CACHE_LOCK:
+        _RESULT_CACHE[key] = (dict(fields), qr_url)
 
 # Extractor
+def extract_all(content: bytes) -> Tuple[Dict[str, Optional[str]], Optional[str]]:
+    """Extract fields and QR URL from the PDF or image file, opening a PDF only once.
+       QR URL is None when no QR code could be decoded.
+    """
+    key = content_digest(content)
+    result = get_cached_result(key)
+    if result is not None:
+        return result
+
+    fields, qr_url, complete = _extract_all(content, key)
+    # A QR scan that failed may succeed on retry, only cache finished scans
+    if complete:
+        cache_result(key, fields, qr_url)
+    return fields, qr_url
+
+def _extract_all(content: bytes, key: bytes) -> Tuple[Dict[str, Optional[str]], Optional[str], bool]:
+    """Extract fields and QR URL from the PDF or image file, bypassing the result cache.
+       The flag is False when the QR scan failed rather than found no QR code.
+    """
+    if not content.startswith(b'%PDF'):
+        fields = extract_fields(content)
+        try:
+            qr_url = extract_qr_url(content)
+        except ValueError:
+            qr_url = None
+        return fields, qr_url, True
+
+    text = get_cached_text(key)
+    qr_url = None
+    complete = True
+    try:
+        with open_pdf(content) as doc:
+            if text is None:
+                text = read_pdf_text(doc)
+                cache_text(key, text)
+            page_count = doc.page_count
+            # The QR is almost always on the first page, remaining pages are
+            # fanned out to worker processes once the document is closed
+            try:
+                qr_url = extract_page_qr(doc, doc[0])
+            except Exception:
+                qr_url = None
+                complete = False
+    except Exception as e:
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+    if qr_url is None and page_count > 1:
+        try:
+            qr_url = scan_pdf_for_qr(content, range(1, page_count))
+        except Exception:
+            qr_url = None
+            complete = False
+
+    return parse_fields(text), qr_url, complete
+
 def extract_fields(file_bytes: bytes) -> Dict[str, Optional[str]]:
     """Extract all fields from the PDF or image file."""
-    text = extract_text(file_bytes)
-    print(text)
+    return parse_fields(extract_text(file_bytes))
+
+def parse_fields(text: str) -> Dict[str, Optional[str]]:
+    """Extract all fields from the document text."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("extracted text: %s", text)
+
+    npwps, names, values = [], [], {}
+    scan_fields(text, npwps, names, values)
+    return build_fields(npwps, names, values)
+
+def scan_fields(text: str, npwps: List[str], names: List[str], values: Dict[str, str]) -> None:
+    """Collect raw field values from the text in one pass, merging into the
+       given NPWP list, name list and first-match values.
+    """
+    # NPWP and name appear for both seller and buyer, other fields keep
+    # their first match
+    for match in _RE_FIELDS.finditer(text):
+        key = match.lastgroup
+        if key == "npwp":
+            npwps.append(match.group(key))
+        elif key == "nama":
+            names.append(match.group(key))
+        else:
+            values.setdefault(key, match.group(key))
+
+def build_fields(npwps: List[str], names: List[str], values: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Normalize raw field values collected by scan_fields."""
     data = {}
 
     # Extract NPWP numbers
-    npwp_numbers = extract_npwp_info(text)
+    npwp_numbers = extract_npwp_info(npwps)
     data["npwpPenjual"] = npwp_numbers[0] if len(npwp_numbers) >= 2 else None
     data["npwpPembeli"] = npwp_numbers[1] if len(npwp_numbers) >= 2 else None
 
     # Extract Buyer and Seller Names
-    tax_subjects = extract_tax_subject_info(text)
-    data["namaPenjual"] = tax_subjects[0]['name'] if len(tax_subjects) >= 2 else None
-    data["namaPembeli"] = tax_subjects[1]['name'] if len(tax_subjects) >= 2 else None
+    # Only the first two names (seller and buyer) are used
+    tax_subjects = extract_tax_subject_info(names[:2])
+    data["namaPenjual"] = tax_subjects[0].name if len(tax_subjects) >= 2 else None
+    data["namaPembeli"] = tax_subjects[1].name if len(tax_subjects) >= 2 else None
 
     # Extract faktur information
-    data["nomorFaktur"] = extract_faktur_number_info(text)
-    data["tanggalFaktur"] = extract_faktur_date_info(text)
+    data["nomorFaktur"] = extract_faktur_number_info(values.get("nomorFaktur"))
+    data["tanggalFaktur"] = extract_faktur_date_info(values.get("tanggalFaktur"))
 
     # Extract amount information
-    data["jumlahDpp"] = extract_tax_amount(text, RE_DPP)
-    data["jumlahPpn"] = extract_tax_amount(text, RE_PPN)
-    data["jumlahPpnBm"] = extract_tax_amount(text, RE_PPNBM)
+    data["jumlahDpp"] = extract_tax_amount(values.get("jumlahDpp"))
+    data["jumlahPpn"] = extract_tax_amount(values.get("jumlahPpn"))
+    data["jumlahPpnBm"] = extract_tax_amount(values.get("jumlahPpnBm"))
 
     return data
 
 def extract_text(content: bytes) -> str:
-    """Extract text content from PDF or image file."""
+    """Extract text content from PDF or image file.
+       PDFs are read from their text layer only and never go through OCR.
+    """
+    key = content_digest(content)
+    text = get_cached_text(key)
+    if text is None:
+        text = _extract_text(content)
+        cache_text(key, text)
+    return text
+
+def _extract_text(content: bytes) -> str:
+    """Extract text content from PDF or image file, bypassing the cache."""
     if content.startswith(b'%PDF'):
         try:
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                text = []
-                for page in pdf.pages:
-                    # Try to extract tables if any
-                    try:
-                        txt = page.extract_text()
-                        if txt:
-                            text.append(txt.strip())
-                    except Exception:
-                        pass  # Skip if table extraction fails
-
-                # Add PDF text-based validation
-                if not text:
-                    raise Exception("No text provided, please provide PDF text-based")
-
-                final_text = '\n\n'.join(filter(None, text))
-                return final_text
+            with open_pdf(content) as doc:
+                return read_pdf_text(doc)
         except Exception as e:
             raise ValueError(f"Failed to extract text from PDF: {str(e)}")
     else:
@@ -95,7 +275,7 @@ def extract_text(content: bytes) -> str:
             img = preprocess_image_for_ocr(img)
 
             # Extract text using OCR
-            text = pytesseract.image_to_string(img, lang='ind')
+            text = pytesseract.image_to_string(img, lang='ind', config=OCR_CONFIG)
             if not text.strip():
                 raise ValueError("No text found in the image")
             return text
@@ -104,52 +284,127 @@ def extract_text(content: bytes) -> str:
         except Exception as e:
             raise ValueError(f"Failed to extract text from image: {str(e)}")
 
-def extract_qr_from_image(img: Image.Image) -> Optional[str]:
-    """Try to extract QR code from an image with multiple preprocessing attempts."""
-    attempts = [
-        lambda x: x,  # Original image
-        enhance_image_for_qr,  # Enhanced image
-        lambda x: x.resize((x.width * 2, x.height * 2)),  # Upscaled
-        lambda x: enhance_image_for_qr(x.resize((x.width * 2, x.height * 2)))  # Enhanced and upscaled
-    ]
-    
-    for attempt in attempts:
+def read_pdf_text(doc: fitz.Document) -> str:
+    """Extract text content from an opened PDF document.
+       Pages are read lazily and the remaining pages are skipped once the pages
+       read so far hold every required field.
+    """
+    text = []
+    npwps, names, values = [], [], {}
+    for index, page_text in iter_page_text(doc):
+        text.append(page_text)
+        if index + 1 < doc.page_count:
+            # Each page is scanned once, only the first two NPWPs and names
+            # (seller and buyer) can affect the required fields
+            scan_fields(page_text, npwps, names, values)
+            if has_required_fields(build_fields(npwps[:2], names[:2], values)):
+                break
+
+    # Add PDF text-based validation
+    if not text:
+        raise Exception("No text provided, please provide PDF text-based")
+
+    return '\n\n'.join(text)
+
+def iter_page_text(doc: fitz.Document) -> Iterator[Tuple[int, str]]:
+    """Yield page index and stripped text of every PDF page that has text."""
+    for index, page in enumerate(doc):
         try:
-            processed = attempt(img)
-            decoded = decode(processed)
-            if decoded:
-                return decoded[0].data.decode('utf-8')
+            txt = extract_page_text(page).strip()
         except Exception:
-            continue
-    return None
+            continue  # Skip pages that fail to extract
+        if txt:
+            yield index, txt
+
+def has_required_fields(fields: Dict[str, Optional[str]]) -> bool:
+    """Check whether every required field has a value."""
+    return all(fields[f] for f in REQUIRED_FIELDS)
+
+def extract_page_text(page: fitz.Page) -> str:
+    """Rebuild page text lines from word boxes.
+       Words are clustered by their bottom edge like pdfplumber does, so label
+       and amount columns on the same row end up on one line.
+    """
+    words = sorted(page.get_text("words"), key=lambda w: (w[3], w[0]))
+
+    lines = []
+    line = []
+    bottom = None
+    for word in words:
+        if line and word[3] - bottom > LINE_TOLERANCE:
+            lines.append(line)
+            line = []
+        if not line:
+            bottom = word[3]
+        line.append(word)
+    if line:
+        lines.append(line)
+
+    return "\n".join(" ".join(w[4] for w in sorted(l, key=lambda w: w[0])) for l in lines)
+
+def extract_qr_from_image(img: Image.Image) -> Optional[str]:
+    """Try to extract QR code from an image with multiple preprocessing attempts.
+       Attempts go from cheapest to most expensive and stop at the first decode.
+    """
+    # Convert once, every attempt works on the grayscale array
+    gray = np.asarray(img.convert('L'))
+
+    # QR codes decode fine well below scan resolution, halve large images
+    # (INTER_AREA averages each 2x2 block) to cut detector work by 4x
+    small = gray
+    if gray.size > QR_MAX_PIXELS:
+        small = cv2.resize(gray, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+
+    # Detector instances are not thread-safe, so each call gets its own
+    detector = cv2.QRCodeDetector()
+
+    try:
+        result = (
+            decode_qr(detector, small)  # Original image
+            or decode_qr(detector, enhance_image_for_qr(small))  # Enhanced image
+        )
+        if result:
+            return result
+
+        # A halved image is retried at full resolution before upscaling,
+        # the upscale always starts from the full resolution array
+        if small is not gray:
+            result = (
+                decode_qr(detector, gray)  # Full resolution
+                or decode_qr(detector, enhance_image_for_qr(gray))  # Enhanced full resolution
+            )
+            if result:
+                return result
+
+        # Upscale once and reuse it for the remaining attempts
+        upscaled = cv2.resize(gray, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+        return (
+            decode_qr(detector, upscaled)  # Upscaled
+            or decode_qr(detector, enhance_image_for_qr(upscaled))  # Enhanced and upscaled
+        )
+    except Exception:
+        return None
+
+def decode_qr(detector: cv2.QRCodeDetector, gray: np.ndarray) -> Optional[str]:
+    """Decode a QR code from a grayscale array, None if nothing was decoded."""
+    try:
+        data, _, _ = detector.detectAndDecode(gray)
+    except cv2.error:
+        return None
+    return data or None
 
 def extract_qr_url(content: bytes) -> Optional[str]:
     """Extract QR code URL from PDF or image file."""
     try:
         # For PDF files
         if content.startswith(b'%PDF'):
-            with pdfplumber.open(io.BytesIO(content)) as pdf:
-                # First try to find QR in rendered pages
-                for page in pdf.pages:
-                    # Convert page to high-resolution image
-                    img = page.to_image(resolution=300)
-                    pil_image = img.original
-                    
-                    result = extract_qr_from_image(pil_image)
-                    if result:
-                        return result
-                    
-                    # Try embedded images
-                    if page.images:
-                        for img_obj in page.images:
-                            try:
-                                img_data = img_obj['stream'].get_data()
-                                img = Image.open(io.BytesIO(img_data))
-                                result = extract_qr_from_image(img)
-                                if result:
-                                    return result
-                            except Exception:
-                                continue
+            with open_pdf(content) as doc:
+                page_count = doc.page_count
+                result = extract_page_qr(doc, doc[0]) if page_count else None
+            if not result and page_count > 1:
+                result = scan_pdf_for_qr(content, range(1, page_count))
+            if result:
+                return result
         else:
             # For direct images (JPG/JPEG)
             try:
@@ -164,37 +419,178 @@ def extract_qr_url(content: bytes) -> Optional[str]:
     except Exception as e:
         raise ValueError(f"Failed to extract QR code: {str(e)}")
 
-def extract_tax_amount(text: str, pattern: str) -> float:
-    """Extract tax value from PDF or image file."""
-    match = re.search(pattern, text)
+def extract_page_qr(doc: fitz.Document, page: fitz.Page) -> Optional[str]:
+    """Extract QR code URL from a single PDF page, called inside open_pdf.
+       Only image extraction and rendering hold _PDF_LOCK, decoding runs with
+       the lock released so concurrent requests are not serialized on OpenCV.
+    """
+    for img in iter_page_qr_images(doc, page):
+        with pdf_lock_released():
+            try:
+                result = extract_qr_from_image(img)
+            except Exception:
+                continue
+        if result:
+            return result
+    return None
+
+def iter_page_qr_images(doc: fitz.Document, page: fitz.Page) -> Iterator[Image.Image]:
+    """Yield candidate QR images of a PDF page, cheapest first."""
+    # Try embedded images first, decoding the QR XObject is far
+    # cheaper than rasterizing the whole page
+    images = page.get_images()
+    for xref, *_ in images:
+        try:
+            img = Image.open(io.BytesIO(doc.extract_image(xref)["image"]))
+        except Exception:
+            continue
+        yield img
+
+    # Render only where small images are placed, this catches QR images
+    # with masks or encodings that do not decode from the raw stream
+    max_area = page.rect.get_area() * QR_MAX_PAGE_FRACTION
+    for xref, *_ in images:
+        for rect in page.get_image_rects(xref):
+            if rect.is_empty or rect.get_area() > max_area:
+                continue
+            yield render_page_gray(page, QR_RESOLUTIONS[-1], clip=rect)
+
+    # Fall back to rendered page, start with a low resolution
+    # and only escalate if decoding fails
+    for resolution in QR_RESOLUTIONS:
+        yield render_page_gray(page, resolution)
+
+def render_page_gray(page: fitz.Page, resolution: int, clip: Optional[fitz.Rect] = None) -> Image.Image:
+    """Render the page, or only the clip area of it, in grayscale."""
+    pix = page.get_pixmap(dpi=resolution, colorspace=fitz.csGRAY, clip=clip)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+def scan_pdf_for_qr(content: bytes, page_indexes: Iterable[int], retries: int = 1) -> Optional[str]:
+    """Scan the given pages of a PDF for a QR code in parallel worker processes.
+       Returns the first QR URL found, remaining tasks are cancelled. A broken
+       pool is replaced and the scan retried up to retries times. Raises when
+       no QR code was found and a page could not be scanned.
+    """
+    error = None
+    page_indexes = list(page_indexes)
+    pool = get_qr_pool()
+    futures = []
+    try:
+        # One task per worker so the PDF is sent and opened once per worker,
+        # pages are interleaved so every worker starts near the front
+        workers = min(qr_worker_count(), len(page_indexes))
+        for i in range(workers):
+            futures.append(pool.submit(scan_pages_for_qr, content, page_indexes[i::workers]))
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                error = e
+                continue
+            if result:
+                return result
+    except BrokenProcessPool:
+        # A worker died (OOM kill, crash on a malformed PDF), the pool can
+        # not be used anymore so the next scan gets a fresh one
+        discard_qr_pool(pool)
+        if retries > 0:
+            return scan_pdf_for_qr(content, page_indexes, retries - 1)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+    if error is not None:
+        raise error
+    return None
+
+def scan_pages_for_qr(content: bytes, page_indexes: List[int]) -> Optional[str]:
+    """Extract QR code URL from the given pages of a PDF, runs in a worker process.
+       Raises when no QR code was found and a page could not be scanned.
+    """
+    error = None
+    with open_pdf(content) as doc:
+        for page_index in page_indexes:
+            try:
+                result = extract_page_qr(doc, doc[page_index])
+            except Exception as e:
+                error = e
+                continue
+            if result:
+                return result
+
+    if error is not None:
+        raise error
+    return None
+
+def qr_worker_count() -> int:
+    """Number of QR worker processes, bounded by the CPUs this process may use."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS and Windows
+        cpus = os.cpu_count() or 1
+    return max(1, min(cpus, QR_MAX_WORKERS))
+
+_qr_pool: Optional[ProcessPoolExecutor] = None
+_qr_pool_lock = threading.Lock()
+
+def get_qr_pool() -> ProcessPoolExecutor:
+    """Return the shared QR worker pool, created on first use.
+       Workers are spawned rather than forked, a fork could copy _PDF_LOCK
+       while another thread holds it.
+    """
+    global _qr_pool
+    with _qr_pool_lock:
+        if _qr_pool is None:
+            _qr_pool = ProcessPoolExecutor(
+                max_workers=qr_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _qr_pool
+
+def discard_qr_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken QR worker pool so get_qr_pool creates a new one."""
+    global _qr_pool
+    with _qr_pool_lock:
+        if _qr_pool is pool:
+            _qr_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_qr_pool() -> None:
+    """Stop the QR worker pool if it was started."""
+    global _qr_pool
+    with _qr_pool_lock:
+        if _qr_pool is not None:
+            _qr_pool.shutdown(cancel_futures=True)
+            _qr_pool = None
+
+def extract_tax_amount(match: Optional[str]) -> float:
+    """Extract tax value from the matched amount."""
     if match:
-        val = normalize_idr(match.group(1))
+        val = normalize_idr(match)
         return val
     return 0.0
 
-def extract_faktur_date_info(text: str) -> Optional[datetime.date]:
-    match = re.search(RE_FAKTUR_DATE, text)
+def extract_faktur_date_info(match: Optional[str]) -> Optional[date]:
     if not match:
         return None
-    return preprocess_indonesian_date(match.group(0))
+    return normalize_indonesian_date(match)
 
-def extract_faktur_number_info(text: str) -> str:
-    match = re.search(RE_FAKTUR_NUMBER, text)
+def extract_faktur_number_info(match: Optional[str]) -> str:
     val = ""
     if match:
         # temporary preprocessing: remove the first 3 digits (XXX.) from faktur number
-        val = match.group(1)[3:] if match.group(1) else match.group(1)
+        val = match[3:]
 
         val = normalize_number(val)
         if len(val) == 16:
             return val
     return val
 
-def extract_npwp_info(text: str) -> List[Optional[str]]:
+def extract_npwp_info(npwp_matches: List[str]) -> List[Optional[str]]:
     """Extract NPWP information for either seller or buyer."""
-    # Look for NPWP pattern specifically after "NPWP: "
-    npwp_matches = re.findall(RE_NPWP, text)
-
     res = []
     for npwp_match in npwp_matches:
         val = normalize_number(npwp_match)
@@ -204,79 +600,46 @@ def extract_npwp_info(text: str) -> List[Optional[str]]:
 
     return res
 
-def extract_tax_subject_info(text: str) -> List[dict]:
+def extract_tax_subject_info(name_matches: List[str]) -> List[TaxSubject]:
     """Extract name and ID card number info for either seller or buyer.
-       Return list of dicts with {name, is_company, raw}.
+       Return list of TaxSubject(name, id_number, is_company).
     """
-    name_matches = re.findall(RE_NAME, text, flags=re.IGNORECASE)
-
     results = []
     for name_match in name_matches:
         raw_val = name_match.strip()
 
         # Detect NIK/Paspor
-        id_card_match = re.search(r"NIK\s*/?\s*Paspor\s*[:\-]*\s*([A-Z0-9]+)", raw_val, flags=re.IGNORECASE)
+        id_card_match = _RE_NIK.search(raw_val)
         if id_card_match:
             # human case → cut out everything after NIK/Paspor
-            val = re.sub(r"\s*NIK\s*/?\s*Paspor.*", "", raw_val, flags=re.IGNORECASE).strip()
+            val = _RE_NIK_STRIP.sub("", raw_val).strip()
             is_company = False
         else:
             # likely company (no NIK or only NIK with symbols like :,-)
-            val = re.sub(r"\s*NIK\s*/?\s*Paspor[:,\.\-]*", "", raw_val, flags=re.IGNORECASE).strip()
+            val = _RE_NIK_LABEL.sub("", raw_val).strip()
             val = normalize_company(val)
             is_company = True
 
-        results.append({
-            "name": val,
-            "id_number": id_card_match.group(1) if id_card_match else None,
-            "is_company": is_company
-        })
+        results.append(TaxSubject(
+            val,
+            id_card_match.group(1) if id_card_match else None,
+            is_company,
+        ))
 
     return results
 
 # Image Preprocessor
+def enhance_grayscale(gray: np.ndarray, amount: float) -> np.ndarray:
+    """Apply CLAHE contrast and an unsharp mask to a grayscale array in one OpenCV pass."""
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8)).apply(gray)
+    blurred = cv2.GaussianBlur(clahe, (0, 0), 3)
+    return cv2.addWeighted(clahe, amount, blurred, 1 - amount, 0)
+
 def preprocess_image_for_ocr(img: Image.Image) -> Image.Image:
     """Preprocess image for better OCR results."""
-    # Convert to grayscale
-    img = img.convert('L')
-
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(1.5)
-
-    # Enhance sharpness
-    enhancer = ImageEnhance.Sharpness(img)
-    img = enhancer.enhance(1.5)
-
-    return img
-
-def enhance_image_for_qr(img: Image.Image) -> Image.Image:
-    """Enhance image to improve QR code detection."""
-    # Convert to grayscale
-    img = img.convert('L')
-
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(img)
-    img = enhancer.enhance(2.0)
-
-    # Enhance sharpness
-    enhancer = ImageEnhance.Sharpness(img)
-    img = enhancer.enhance(2.0)
-
-    return img
-
-def preprocess_indonesian_date(date_str: str) -> Optional[datetime.date]:
-    """Parse string date formats: dd <bulan indo> yyyy"""
-    s = date_str.strip()
-
-    parts = s.split(" ")
-    if len(parts) != 3:
-        return None
-
-    parts[1] = indonesian_months.get(parts[1].lower(), "")
-    if parts[1] == "":
-        return None
-
-    s = " ".join(parts)
+    gray = np.asarray(img.convert('L'))
+    return Image.fromarray(enhance_grayscale(gray, 1.5))
 
-    return datetime.strptime(s.title(), "%d %B %Y").date()
+def enhance_image_for_qr(gray: np.ndarray) -> np.ndarray:
+    """Enhance grayscale array to improve QR code detection."""
+    return enhance_grayscale(gray, 2.0)
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import date
+
+import httpx
+import pytest
+from cachetools import TTLCache
+
+from app.services import djp_client
+
+MOCK_XML = b"""<resValidateFakturPm>
+  <nomorFaktur>0700002212345678</nomorFaktur>
+  <tanggalFaktur>01/04/2022</tanggalFaktur>
+  <npwpPenjual>012345678012000</npwpPenjual>
+  <namaPenjual>PT. ABC</namaPenjual>
+  <npwpLawanTransaksi>023456789217000</npwpLawanTransaksi>
+  <namaLawanTransaksi>pt xyz</namaLawanTransaksi>
+  <jumlahDpp>15000000</jumlahDpp>
+  <jumlahPpn>1650000</jumlahPpn>
+  <jumlahPpnBm>0</jumlahPpnBm>
+</resValidateFakturPm>"""
+
+
+def test_parse_xml_response():
+    assert djp_client.parse_xml_response(MOCK_XML) == {
+        "npwpPenjual": "012345678012000",
+        "namaPenjual": "PT ABC",
+        "npwpPembeli": "023456789217000",
+        "namaPembeli": "PT XYZ",
+        "nomorFaktur": "0700002212345678",
+        "tanggalFaktur": date(2022, 4, 1),
+        "jumlahDpp": 15000000.0,
+        "jumlahPpn": 1650000.0,
+        "jumlahPpnBm": 0.0,
+    }
+
+
+def test_parse_xml_response_missing_and_empty_tags():
+    xml = b"""<resValidateFakturPm>
+      <nomorFaktur>0700002212345678</nomorFaktur>
+      <tanggalFaktur></tanggalFaktur>
+      <namaPenjual/>
+      <jumlahDpp>15000000</jumlahDpp>
+    </resValidateFakturPm>"""
+    data = djp_client.parse_xml_response(xml)
+    assert data["nomorFaktur"] == "0700002212345678"
+    assert data["jumlahDpp"] == 15000000.0
+    for key in ("tanggalFaktur", "namaPenjual", "npwpPenjual", "npwpPembeli",
+                "namaPembeli", "jumlahPpn", "jumlahPpnBm"):
+        assert data[key] is None
+
+
+def test_parse_xml_response_ignores_nested_tags():
+    xml = b"""<resValidateFakturPm>
+      <detailTransaksi><nomorFaktur>999</nomorFaktur></detailTransaksi>
+      <nomorFaktur>0700002212345678</nomorFaktur>
+    </resValidateFakturPm>"""
+    assert djp_client.parse_xml_response(xml)["nomorFaktur"] == "0700002212345678"
+
+
+def test_parse_xml_response_honours_declared_encoding():
+    xml = ('<?xml version="1.0" encoding="ISO-8859-1"?>'
+           "<resValidateFakturPm><namaPenjual>PT Café</namaPenjual></resValidateFakturPm>")
+    data = djp_client.parse_xml_response(xml.encode("iso-8859-1"))
+    assert data["namaPenjual"] == "PT CAFÉ"
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("01/04/2022", date(2022, 4, 1)),
+    ("1/4/2022", date(2022, 4, 1)),
+])
+def test_parse_ddmmyyyy(value, expected):
+    assert djp_client.parse_ddmmyyyy(value) == expected
+
+
+@pytest.mark.parametrize("value", ["31/02/2022", "2022-04-01", "01/04"])
+def test_parse_ddmmyyyy_invalid(value):
+    with pytest.raises(ValueError):
+        djp_client.parse_ddmmyyyy(value)
+
+
+def test_fetch_djp_xml_caches_and_returns_copies(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(200, content=MOCK_XML)
+
+    monkeypatch.setattr(djp_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    monkeypatch.setattr(djp_client, "_cache", TTLCache(maxsize=16, ttl=60))
+
+    async def fetch_twice():
+        first = await djp_client.fetch_djp_xml("http://djp.test/faktur/1")
+        first["nomorFaktur"] = "mutated"
+        second = await djp_client.fetch_djp_xml("http://djp.test/faktur/1")
+        await djp_client.close_client()
+        return second
+
+    second = asyncio.run(fetch_twice())
+    assert len(calls) == 1
+    assert second["nomorFaktur"] == "0700002212345678"
@@ -0,0 +1,46 @@
+from datetime import date
+
+import pytest
+
+from app.core.normalizers import (
+    normalize_number,
+    normalize_idr,
+    normalize_indonesian_date,
+)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("01.234.567.8-012.000", "012345678012000"),
+    # Non-latin-1 characters (en dash, ideographic space) fall back to the regex
+    ("01.234–567　8", "012345678"),
+    ("abc", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_number(value, expected):
+    assert normalize_number(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("36.364.855,00", 36364855.0),
+    (" 812.500,50 ", 812500.5),
+    ("0,00", 0.0),
+    ("", 0.0),
+    ("Rp", 0.0),
+])
+def test_normalize_idr(value, expected):
+    assert normalize_idr(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("8 Oktober 2020", date(2020, 10, 8)),
+    ("13 DESEMBER 2018", date(2018, 12, 13)),
+    ("29 Februari 2024", date(2024, 2, 29)),
+    ("31 Februari 2022", None),
+    ("29 Februari 2023", None),
+    ("1 Foo 2022", None),
+    ("1 April", None),
+    ("1 April 2022 extra", None),
+])
+def test_normalize_indonesian_date(value, expected):
+    assert normalize_indonesian_date(value) == expected
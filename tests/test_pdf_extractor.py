@@ -0,0 +1,107 @@
+import io
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from pathlib import Path
+
+import fitz
+import pytest
+from PIL import Image
+
+from app.services import pdf_extractor
+
+MOCK_DIR = Path(__file__).resolve().parents[1] / "app" / "mock"
+
+# Fields extracted from the bundled text-based PDFs, pinned so changes to the
+# text line rebuilding (extract_page_text) cannot silently swap seller/buyer
+# or split amounts from their labels
+EXPECTED_FIELDS = {
+    "faktur_single_product.pdf": {
+        "npwpPenjual": "076257799611001",
+        "npwpPembeli": "033063918011000",
+        "namaPenjual": "JOE LUCKY",
+        "namaPembeli": "PT NOVAMEX INDONESIA",
+        "nomorFaktur": "0072048242635",
+        "tanggalFaktur": date(2020, 10, 8),
+        "jumlahDpp": 8125000.0,
+        "jumlahPpn": 812500.0,
+        "jumlahPpnBm": 0.0,
+    },
+    "faktur_multiple_products.pdf": {
+        "npwpPenjual": "856977996118000",
+        "npwpPembeli": "800899718124000",
+        "namaPenjual": "CV KELUARGA FARMA",
+        "namaPembeli": "PT BASARIA JAYA MANDIRI",
+        "nomorFaktur": "0051889443330",
+        "tanggalFaktur": date(2018, 12, 13),
+        "jumlahDpp": 36364855.0,
+        "jumlahPpn": 3636485.0,
+        "jumlahPpnBm": 3636485.0,
+    },
+}
+
+
+@pytest.mark.parametrize("filename, expected", EXPECTED_FIELDS.items())
+def test_extract_fields_from_text_pdf(filename, expected):
+    content = (MOCK_DIR / filename).read_bytes()
+    assert pdf_extractor.extract_fields(content) == expected
+
+
+@pytest.mark.parametrize("filename, expected", EXPECTED_FIELDS.items())
+def test_extract_all_from_text_pdf(filename, expected):
+    content = (MOCK_DIR / filename).read_bytes()
+    fields, qr_url = pdf_extractor.extract_all(content)
+    assert fields == expected
+    assert qr_url.startswith("http://svc.efaktur.pajak.go.id/validasi/faktur/")
+
+
+def test_extract_qr_from_large_image_with_small_qr():
+    # Large images are halved first, a QR that only decodes at full
+    # resolution or upscaled from it must still be found
+    with fitz.open(MOCK_DIR / "faktur_single_product.pdf") as doc:
+        xref = doc[0].get_images()[0][0]
+        qr = Image.open(io.BytesIO(doc.extract_image(xref)["image"])).convert("L")
+    canvas = Image.new("L", (2500, 2500), 255)
+    canvas.paste(qr.resize((150, 150)), (1000, 1000))
+
+    qr_url = pdf_extractor.extract_qr_from_image(canvas)
+    assert qr_url.startswith("http://svc.efaktur.pajak.go.id/validasi/faktur/")
+
+
+def test_extract_all_does_not_cache_failed_qr_scan(monkeypatch):
+    # Trailing comment changes the content digest so earlier tests do not
+    # serve this upload from the cache
+    content = (MOCK_DIR / "faktur_single_product.pdf").read_bytes() + b"\n% retry\n"
+
+    def fail(doc, page):
+        raise RuntimeError("transient failure")
+
+    with monkeypatch.context() as m:
+        m.setattr(pdf_extractor, "extract_page_qr", fail)
+        _, qr_url = pdf_extractor.extract_all(content)
+    assert qr_url is None
+
+    _, qr_url = pdf_extractor.extract_all(content)
+    assert qr_url.startswith("http://svc.efaktur.pajak.go.id/validasi/faktur/")
+
+
+def test_scan_pdf_for_qr_recovers_from_dead_worker():
+    # QR only on the second page, so the scan has to go through the pool
+    with fitz.open() as doc, fitz.open(MOCK_DIR / "faktur_single_product.pdf") as src:
+        doc.new_page()
+        doc.insert_pdf(src)
+        content = doc.tobytes()
+
+    try:
+        pool = pdf_extractor.get_qr_pool()
+        pool.submit(int).result()  # Start the workers
+        for process in list(pool._processes.values()):
+            process.kill()
+            process.join()
+
+        with pytest.raises(BrokenProcessPool):
+            pdf_extractor.scan_pdf_for_qr(content, [1], retries=0)
+
+        qr_url = pdf_extractor.scan_pdf_for_qr(content, [1])
+        assert qr_url.startswith("http://svc.efaktur.pajak.go.id/validasi/faktur/")
+    finally:
+        pdf_extractor.shutdown_qr_pool()